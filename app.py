@@ -1,15 +1,22 @@
 from flask import Flask, jsonify
-from routes.email_tracking import email_tracking_bp
-from routes.email_send_import import email_send_import_bp
+from routes.email_tracking import email_tracking_bp, pixel_middleware
+from routes.email_send_import import email_send_import_bp, MAX_UPLOAD_BYTES
 from flask_cors import CORS
 import os
 
 app = Flask(__name__)
 
+# Hard cap on any request body (upload file + form fields); the upload route
+# checks the file itself against MAX_UPLOAD_BYTES and explains the limit
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 1024 * 1024
+
 # IMPORTANT
 app.register_blueprint(email_tracking_bp, url_prefix="/email_tracking")
 app.register_blueprint(email_send_import_bp, url_prefix="/email_send_import")
 
+# open.gif is the hottest route: plain GETs are served straight from WSGI
+app.wsgi_app = pixel_middleware(app.wsgi_app, "/email_tracking/open.gif")
+
 print("\n==== REGISTERED ROUTES ====")
 for r in app.url_map.iter_rules():
     print(r, r.methods)
@@ -32,6 +39,10 @@ CORS(app, resources={r"/*": {"origins": ["https://email-automation-dashboard-mao
 def root():
     return jsonify({"service": "email-tracking-backend", "status": "running"})
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"message": "Request too large", "status": 413, "data": {}}), 413
+
 @app.get("/health")
 def health():
     return "ok", 200
@@ -0,0 +1,12 @@
+# Read automatically by `gunicorn app:app` when started from the repo root.
+# Command-line flags (-w, --threads, ...) still take precedence.
+import os
+
+# Threaded workers: a long /upload (file parsing + DB writes) only ties up one
+# thread, so concurrent uploads, reports and tracking hits don't queue behind it.
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+# Pools are per worker: keep threads <= DB_POOL_SIZE (routes/email_send_import.py).
+# The tracking pool sizes itself from GUNICORN_THREADS (threads + its 5 background
+# writers, max 32), so set threads through that variable, not --threads, and keep it <= 27.
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
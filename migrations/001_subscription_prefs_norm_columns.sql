@@ -0,0 +1,10 @@
+-- Normalized (LOWER/TRIM) copies of the pair columns so preference lookups
+-- can match case/whitespace-insensitively and still use an index.
+-- Used by fetch_subscription_prefs() in routes/email_send_import.py.
+
+ALTER TABLE email_subscription_preferences
+    ADD COLUMN sender_email_norm VARCHAR(255)
+        GENERATED ALWAYS AS (LOWER(TRIM(sender_email))) STORED,
+    ADD COLUMN receiver_email_norm VARCHAR(255)
+        GENERATED ALWAYS AS (LOWER(TRIM(receiver_email))) STORED,
+    ADD INDEX ix_pref_pair_updated (sender_email_norm, receiver_email_norm, updated_at DESC);
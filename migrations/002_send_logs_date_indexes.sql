@@ -0,0 +1,6 @@
+-- Date filters in email_report() are range predicates on the raw columns
+-- (col >= day AND col < day + 1), which these indexes serve directly.
+
+ALTER TABLE email_send_logs
+    ADD INDEX ix_logs_sent_at (sent_at),
+    ADD INDEX ix_logs_updated_at (updated_at);
@@ -0,0 +1,10 @@
+-- The upload path writes every row with one
+-- INSERT ... ON DUPLICATE KEY UPDATE keyed on dedupe_key, so the column must
+-- carry a UNIQUE index. Skip this if the table already has one.
+--
+-- Existing duplicates block the ALTER; list them first with:
+--   SELECT dedupe_key, COUNT(*) FROM email_send_logs
+--   GROUP BY dedupe_key HAVING COUNT(*) > 1;
+
+ALTER TABLE email_send_logs
+    ADD UNIQUE INDEX ux_logs_dedupe_key (dedupe_key);
@@ -0,0 +1,13 @@
+-- Normalized (LOWER/TRIM) copy of responds so the report's responds_filter
+-- and monthly counts compare a plain indexed column instead of evaluating
+-- LOWER(TRIM(responds)) on every row.
+-- Truncated to 255 chars: responds is free text from the upload and the
+-- filters only compare against short labels, so a long reply must not make
+-- the stored value overflow (and fail the whole upsert batch in strict mode).
+-- Used by email_report() in routes/email_send_import.py.
+
+ALTER TABLE email_send_logs
+    ADD COLUMN responds_norm VARCHAR(255)
+        GENERATED ALWAYS AS (LEFT(LOWER(TRIM(responds)), 255)) STORED,
+    ADD INDEX ix_logs_responds_norm_sent (responds_norm, sent_at),
+    ADD INDEX ix_logs_responds_norm_updated (responds_norm, updated_at);
@@ -0,0 +1,13 @@
+-- idx_unsub_lookup: the "latest SENT row for this pair" subquery in
+-- unsubscribe() (routes/email_tracking.py) seeks the pair + status and reads
+-- sent_at DESC from the index (id rides along as the primary key).
+-- idx_type_sent / idx_type_updated: email_report() filtered by email_type and
+-- ordered by sent_at / updated_at, including keyset pages.
+--
+-- Check afterwards with EXPLAIN on the unsubscribe subquery: it should use
+-- idx_unsub_lookup with type=ref.
+
+ALTER TABLE email_send_logs
+    ADD INDEX idx_unsub_lookup (sender_email, receiver_email, status, sent_at),
+    ADD INDEX idx_type_sent (email_type, sent_at),
+    ADD INDEX idx_type_updated (email_type, updated_at);
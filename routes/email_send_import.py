@@ -1,10 +1,14 @@
 import os
 import re
+import json
 import hashlib
+import threading
 from datetime import datetime
-from flask import Blueprint, request
+from flask import Blueprint, request, Response
 import pandas as pd
+from python_calamine import CalamineWorkbook
 import mysql.connector
+from mysql.connector import pooling
 from config import Config
 
 email_send_import_bp = Blueprint("email_send_import", __name__, url_prefix="/email_send_import")
@@ -23,32 +27,75 @@ EXPECTED_HEADERS = [
     "Our Response",
 ]
 
+# Free-text columns: stripped, blank -> NULL
+TEXT_COLUMNS = [
+    "First Name",
+    "Company",
+    "Status",
+    "StatusMessage",
+    "Responds",
+    "Subject",
+    "Body",
+    "Our Response",
+]
+
+SENT_AT_FORMATS = (
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+)
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Same shapes as SENT_AT_FORMATS: m/d/Y or Y-m-d, then H:M with optional :S
+SENT_AT_RE = re.compile(
+    r"^(?:(\d{1,2})/(\d{1,2})/(\d{4})|(\d{4})-(\d{1,2})-(\d{1,2}))\s+(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?$"
+)
+
 # =========================
 # DB + helpers
 # =========================
-def get_db_connection():
-    conn = mysql.connector.connect(
-        host=Config.TRACK_DB_HOST,
-        user=Config.TRACK_DB_USER,
-        password=Config.TRACK_DB_PASS,
-        database=Config.TRACK_DB_NAME,
-        port=Config.TRACK_DB_PORT,
-        use_pure=True,
-    )
-
-    # 🔥 FORCE IST TIMEZONE FOR SESSION
-    cursor = conn.cursor()
-    cursor.execute("SET time_zone = '+05:30'")
-    cursor.close()
+DB_POOL_SIZE = 8
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_db_pool():
+    # Created on first use so the app still boots while the DB is unreachable
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="email_send_import",
+                    pool_size=DB_POOL_SIZE,
+                    # Sessions are not reset on release, so the init_command below
+                    # sticks for the life of the physical connection
+                    pool_reset_session=False,
+                    # Reads never hold a snapshot open across requests; writes use
+                    # an explicit conn.start_transaction()
+                    autocommit=True,
+                    # 🔥 FORCE IST TIMEZONE FOR SESSION (runs once per physical connection)
+                    init_command="SET time_zone = '+05:30'",
+                    host=Config.TRACK_DB_HOST,
+                    user=Config.TRACK_DB_USER,
+                    password=Config.TRACK_DB_PASS,
+                    database=Config.TRACK_DB_NAME,
+                    port=Config.TRACK_DB_PORT,
+                )
+    return _pool
 
-    return conn
+def get_db_connection():
+    # conn.close() hands the connection back to the pool
+    return get_db_pool().get_connection()
 
 
 def api_response(message, status=200, data=None):
     return {"message": message, "status": status, "data": data or {}}, status
 
 def normalize_header(h: str) -> str:
-    return re.sub(r"\s+", " ", (h or "").strip())
+    return WHITESPACE_RE.sub(" ", (h or "").strip())
 
 def norm_email(val: str) -> str:
     return (val or "").strip().lower()
@@ -57,6 +104,30 @@ def norm_text(val: str):
     s = (val or "").strip()
     return s if s else None
 
+def norm_text_column(col: pd.Series) -> pd.Series:
+    """Vectorized norm_text: stripped strings, blanks -> None."""
+    col = col.str.strip().astype(object)
+    return col.where(col.ne(""), None)
+
+def parse_sent_at_column(col: pd.Series) -> pd.Series:
+    """
+    Vectorized parse_sent_at: tries each known format over the whole column,
+    only the leftovers go through the per-value fallback.
+    """
+    text = col.str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt in SENT_AT_FORMATS:
+        missing = parsed.isna() & text.ne("")
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+
+    values = [
+        v.to_pydatetime() if not pd.isna(v) else (parse_sent_at(t) if t else None)
+        for v, t in zip(parsed, text)
+    ]
+    return pd.Series(values, index=text.index, dtype=object)
+
 def parse_sent_at(val):
     if val is None:
         return None
@@ -72,14 +143,14 @@ def parse_sent_at(val):
     if not s:
         return None
 
-    for fmt in (
-        "%m/%d/%Y %H:%M:%S",
-        "%m/%d/%Y %H:%M",
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d %H:%M",
-    ):
+    # SENT_AT_FORMATS by shape: one regex match instead of up to four failing strptime calls
+    m = SENT_AT_RE.match(s)
+    if m:
+        mon, day, year, iso_year, iso_mon, iso_day, hh, mm, ss = m.groups()
+        if year is None:
+            year, mon, day = iso_year, iso_mon, iso_day
         try:
-            return datetime.strptime(s, fmt)
+            return datetime(int(year), int(mon), int(day), int(hh), int(mm), int(ss or 0))
         except ValueError:
             pass
 
@@ -104,32 +175,355 @@ def is_real_response(responds: str | None) -> bool:
     return v not in ("", "no response yet")
 
 
+UNSUBSCRIBE_RESPONSES = ("unsubscribed", "not interested")
+
 def is_unsubscribe_response(responds: str | None) -> bool:
     if not responds:
         return False
     val = responds.strip().lower()
-    return val in ("unsubscribed", "not interested")
-
-def fmt_dt(v):
-    return v.strftime("%Y-%m-%d %H:%M:%S") if isinstance(v, datetime) else v
+    return val in UNSUBSCRIBE_RESPONSES
 
 # =========================
 # DEDUPE (includes email_type)
 # =========================
-# ✅ IMPORTANT: update your dedupe helper signature like this:
+DEDUPE_SENT_FMT = "%Y-%m-%d %H:%M:%S"
+
+def make_dedupe_keys(sender: pd.Series, receiver: pd.Series, sent_at: pd.Series, email_type: str, send_process: str) -> pd.Series:
+    """
+    md5(sender|receiver|EMAIL_TYPE|send_process|sent_at) per row, None when sent_at is missing.
+    sender/receiver must already be normalized; send_process is kept as stored ("Regular"/"Follow up 1").
+    """
+    suffix = "|" + (email_type or "").strip().upper() + "|" + (send_process or "").strip() + "|"
+    prefixes = sender + "|" + receiver + suffix
+    md5 = hashlib.md5
+    keys = [
+        md5((p + d.strftime(DEDUPE_SENT_FMT)).encode("utf-8")).hexdigest() if d else None
+        for p, d in zip(prefixes, sent_at)
+    ]
+    return pd.Series(keys, index=sender.index, dtype=object)
+
+def fetch_subscription_prefs(cur, pairs, chunk_size=500):
+    """
+    Latest is_subscribed per (sender, receiver) pair -> {(sender, receiver): is_subscribed}
+    Pairs must already be normalized (see norm_email); they are matched against the
+    indexed *_email_norm generated columns (migrations/001_subscription_prefs_norm_columns.sql).
+    """
+    pref_map = {}
+    for i in range(0, len(pairs), chunk_size):
+        chunk = pairs[i:i + chunk_size]
+        placeholders = ",".join(["(%s,%s)"] * len(chunk))
+        params = [v for pair in chunk for v in pair]
+        cur.execute(
+            f"""
+            SELECT sender_email_norm, receiver_email_norm, is_subscribed
+            FROM (
+                SELECT sender_email_norm, receiver_email_norm, is_subscribed,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY sender_email_norm, receiver_email_norm
+                           ORDER BY updated_at DESC
+                       ) AS rn
+                FROM email_subscription_preferences
+                WHERE (sender_email_norm, receiver_email_norm) IN ({placeholders})
+            ) t
+            WHERE rn = 1
+            """,
+            params,
+        )
+        for row in cur.fetchall():
+            pref_map[(row["sender_email_norm"], row["receiver_email_norm"])] = row["is_subscribed"]
+    return pref_map
+
+def fetch_existing_keys(conn, dedupe_keys):
+    """
+    Which of the given dedupe keys already exist in email_send_logs -> set
+
+    Keys are loaded into a session temp table and joined once, instead of
+    one IN (...) statement per chunk of keys. Only the key comes back; whether
+    an existing row actually changes is decided by the upsert itself.
+    Uses its own tuple cursor and streams the result straight into the set.
+    """
+    existing_keys = set()
+    if not dedupe_keys:
+        return existing_keys
+
+    cur = conn.cursor()
+
+    # md5 hex keys are pure ASCII, so this column joins against any charset without a collation clash.
+    # One batch of fixed-width keys fits easily in a MEMORY table; no InnoDB temp tablespace I/O.
+    cur.execute("DROP TEMPORARY TABLE IF EXISTS tmp_dedupe")
+    cur.execute(
+        "CREATE TEMPORARY TABLE tmp_dedupe "
+        "(dedupe_key CHAR(32) CHARACTER SET ascii NOT NULL PRIMARY KEY) ENGINE=MEMORY"
+    )
+    try:
+        cur.executemany(
+            "INSERT INTO tmp_dedupe (dedupe_key) VALUES (%s)",
+            [(k,) for k in dict.fromkeys(dedupe_keys)],
+        )
+        cur.execute(
+            """
+            SELECT e.dedupe_key
+            FROM email_send_logs e
+            JOIN tmp_dedupe t ON t.dedupe_key = e.dedupe_key
+            """
+        )
+        existing_keys.update(key for (key,) in cur)
+    finally:
+        try:
+            cur.execute("DROP TEMPORARY TABLE IF EXISTS tmp_dedupe")
+        finally:
+            cur.close()
+    return existing_keys
+
+# =========================
+# Upload file reading
+# =========================
+UPLOAD_EXTENSIONS = (".xlsx", ".xls", ".csv")
+UPLOAD_BATCH_ROWS = 1000
+# Larger files are refused (413) before any parser touches them; app.py caps the whole request just above this
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+CSV_CHUNK_ROWS = 5000
+
+def excel_cell_str(v):
+    """Cell value as the string pandas' dtype=str would give ("" for empty)."""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def iter_upload(f, ext):
+    """
+    Yields the normalized header list first, then DataFrames of raw cell strings
+    ("" for empty cells) using those headers.
+
+    .xlsx/.xls are parsed with calamine and handed over UPLOAD_BATCH_ROWS rows per
+    DataFrame; .csv goes through pandas' chunked reader (CSV_CHUNK_ROWS per
+    DataFrame). Only one batch of python objects is alive at a time.
+    """
+    if ext == ".csv":
+        reader = pd.read_csv(f, dtype=str, chunksize=CSV_CHUNK_ROWS)
+        try:
+            headers = None
+            for chunk in reader:
+                chunk.columns = [normalize_header(c) for c in chunk.columns]
+                if headers is None:
+                    headers = list(chunk.columns)
+                    yield headers
+                yield chunk.fillna("")
+        finally:
+            reader.close()
+        return
+
+    wb = CalamineWorkbook.from_filelike(f.stream)
+    try:
+        rows = wb.get_sheet_by_index(0).iter_rows()
+        headers = [normalize_header(excel_cell_str(h)) for h in next(rows, ())]
+        yield headers
+
+        width = len(headers)
+        batch = []
+        for raw in rows:
+            cells = [excel_cell_str(v) for v in raw[:width]]
+            if not any(cells):
+                continue
+            cells.extend([""] * (width - len(cells)))
+            batch.append(cells)
+            if len(batch) >= UPLOAD_BATCH_ROWS:
+                yield pd.DataFrame(batch, columns=headers)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=headers)
+    finally:
+        wb.close()
+
+
+# Fields compared to decide whether an existing row changed (byte-exact, NULL-safe)
+UPSERT_DIFF_FIELDS = (
+    "first_name",
+    "company",
+    "status",
+    "status_message",
+    "responds",
+    "subject",
+    "body",
+    "our_response",
+)
+
+# New rows are inserted, existing ones hit the dedupe_key UNIQUE index and take
+# the update branch -- one statement for both. updated_at only moves when a field
+# actually differs; its assignment has to come first, because later assignments
+# would already have overwritten the values it compares against.
+UPSERT_LOGS_SQL = """
+    INSERT INTO email_send_logs
+    (sender_email, receiver_email, email_type, send_process, first_name, company, status, status_message,
+     sent_at, responds, updated_at, subject, body, our_response, dedupe_key)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    ON DUPLICATE KEY UPDATE
+        updated_at=IF(updated_at IS NULL OR {changed}, VALUES(updated_at), updated_at),
+        first_name=VALUES(first_name),
+        company=VALUES(company),
+        status=VALUES(status),
+        status_message=VALUES(status_message),
+        responds=VALUES(responds),
+        subject=VALUES(subject),
+        body=VALUES(body),
+        our_response=VALUES(our_response)
+""".format(
+    changed=" OR ".join(
+        f"NOT (CAST({f} AS BINARY) <=> CAST(VALUES({f}) AS BINARY))" for f in UPSERT_DIFF_FIELDS
+    )
+)
+
+
+def import_batch(conn, cur, df, email_type, send_process, counts, pref_cache, seen_keys):
+    """
+    Normalize one batch of uploaded rows and upsert it into email_send_logs.
+    Updates the counters in `counts`; returns how many rows were valid candidates.
+    Shared by all batches of one upload:
+      - pref_cache: {(sender, receiver): is_subscribed or None}
+      - seen_keys: dedupe keys already written by earlier batches
+    """
+    counts["total_rows_in_file"] += int(len(df))
+    df = df[EXPECTED_HEADERS].copy()
+
+    # Normalize whole columns up front (same rules as norm_email / norm_text / parse_sent_at)
+    df["Sender Email"] = df["Sender Email"].str.strip().str.lower()
+    df["Receiver Email"] = df["Receiver Email"].str.strip().str.lower()
+    for col in TEXT_COLUMNS:
+        df[col] = norm_text_column(df[col])
+    df["SentAt"] = parse_sent_at_column(df["SentAt"])
+
+    has_emails = df["Sender Email"].ne("") & df["Receiver Email"].ne("")
+    counts["skipped"] += int((~has_emails).sum())
+    df = df.loc[has_emails]
+    df["dedupe_key"] = make_dedupe_keys(
+        df["Sender Email"], df["Receiver Email"], df["SentAt"], email_type, send_process
+    )
+
+    # Subscription preferences for every (sender, receiver) pair in the batch,
+    # fetched up front instead of one SELECT per row; pairs already seen in an
+    # earlier batch (None = no preference row) are not queried again
+    pairs = [
+        pair
+        for pair in df[["Sender Email", "Receiver Email"]].drop_duplicates().itertuples(index=False, name=None)
+        if pair not in pref_cache
+    ]
+    pref_cache.update(dict.fromkeys(pairs))
+    pref_cache.update(fetch_subscription_prefs(cur, pairs))
+
+    # ✅ If reply is "unsubscribed" or "not interested", update subscription
+    unsub_reply = df["Responds"].str.strip().str.lower().isin(UNSUBSCRIBE_RESPONSES)
+
+    # Unsubscribe override, in file order like the row-by-row import: a pair is
+    # unsubscribed for every row if it already was before this row's batch (DB or
+    # an earlier batch), otherwise from its first unsubscribe reply onwards
+    pair_cols = [df["Sender Email"], df["Receiver Email"]]
+    unsubscribed = pd.Series(
+        [str(pref_cache.get(pair)) == "0" for pair in zip(*pair_cols)],
+        index=df.index,
+        dtype=bool,
+    ) | unsub_reply.groupby(pair_cols).cummax().astype(bool)
+
+    unsub_pairs = list(dict.fromkeys(
+        df.loc[unsub_reply, ["Sender Email", "Receiver Email"]].itertuples(index=False, name=None)
+    ))
+    if unsub_pairs:
+        now = datetime.now()
+        cur.executemany(
+            """
+            INSERT INTO email_subscription_preferences
+              (sender_email, receiver_email, is_subscribed, updated_at)
+            VALUES (%s, %s, 0, %s)
+            ON DUPLICATE KEY UPDATE
+              is_subscribed=0,
+              updated_at=VALUES(updated_at)
+            """,
+            [(sender_email, receiver_email, now) for sender_email, receiver_email in unsub_pairs],
+        )
+        pref_cache.update(dict.fromkeys(unsub_pairs, 0))
+    counts["unsubscribed_overrides"] += int(unsub_reply.sum())
+
+    # ✅ DEDUPE includes send_process now (None when SentAt is missing)
+    has_key = df["dedupe_key"].notna()
+    counts["skipped"] += int((~has_key).sum())
+
+    # Apply the override to the rows that will be written
+    counts["unsubscribed_overrides"] += int((unsubscribed & has_key & ~unsub_reply).sum())
+    df.loc[unsubscribed & has_key, "Responds"] = "Unsubscribed"
+    df.loc[unsub_reply | unsubscribed, "StatusMessage"] = "Receiver Unsubscribed via mail"
+
+    df = df.loc[has_key]
+
+    # Same dedupe_key more than once in the file: only the last occurrence is written.
+    # Within the batch the earlier copies are dropped here; a key already written by an
+    # earlier batch is still upserted (last one wins) but not counted as inserted/updated.
+    before = len(df)
+    df = df.drop_duplicates(subset=["dedupe_key"], keep="last")
+    dedupe_keys = df["dedupe_key"].tolist()
+    repeated_keys = seen_keys.intersection(dedupe_keys)
+    seen_keys.update(dedupe_keys)
+    counts["intra_file_dupes"] += before - len(df) + len(repeated_keys)
+
+    if df.empty:
+        return 0
+
+    now = datetime.now()
+    upsert_rows = [
+        (
+            sender_email,
+            receiver_email,
+            email_type,
+            send_process,     # ✅ NEW
+            first_name,
+            company,
+            status,
+            status_message,
+            sent_at,
+            responds_value,
+            now,
+            subject,
+            body,
+            our_response,
+            dkey,
+        )
+        for (
+            sender_email,
+            receiver_email,
+            first_name,
+            company,
+            status,
+            status_message,
+            sent_at,
+            responds_value,
+            subject,
+            body,
+            our_response,
+            dkey,
+        ) in df.itertuples(index=False, name=None)
+    ]
+
+    # Only existence is fetched (single JOIN, see fetch_existing_keys); the upsert
+    # itself decides whether an existing row changed
+    existing_keys = fetch_existing_keys(conn, dedupe_keys)
+
+    # Keys already written by an earlier batch go in their own statement so the
+    # affected-rows count of the main one maps onto this batch's counters only
+    fresh_rows = [r for r in upsert_rows if r[-1] not in repeated_keys]
+    repeat_rows = [r for r in upsert_rows if r[-1] in repeated_keys]
+
+    if fresh_rows:
+        cur.executemany(UPSERT_LOGS_SQL, fresh_rows)
+        # Affected rows per row: 1 = inserted, 2 = updated, 0 = unchanged
+        inserted = sum(1 for r in fresh_rows if r[-1] not in existing_keys)
+        updated = max(cur.rowcount - inserted, 0) // 2
+        counts["inserted"] += inserted
+        counts["updated"] += updated
+        counts["duplicates_no_change"] += len(fresh_rows) - inserted - updated
+    if repeat_rows:
+        cur.executemany(UPSERT_LOGS_SQL, repeat_rows)
+
+    return len(upsert_rows)
 
-def make_dedupe_key(sender: str, receiver: str, sent_at: datetime, email_type: str, send_process: str):
-    if not sent_at:
-        return None
-    sent = sent_at.strftime("%Y-%m-%d %H:%M:%S")
-    raw = "|".join([
-        (sender or "").strip().lower(),
-        (receiver or "").strip().lower(),
-        (email_type or "").strip().upper(),
-        (send_process or "").strip(),   # keep as stored ("Regular"/"Follow up 1")
-        sent,
-    ])
-    return hashlib.md5(raw.encode("utf-8")).hexdigest()
 # =========================
 # Upload API
 # =========================
@@ -180,21 +574,28 @@ def upload_email_send_file():
         return api_response("Empty file", 400)
 
     ext = os.path.splitext(f.filename.lower())[1]
+    if ext not in UPLOAD_EXTENSIONS:
+        return api_response("Unsupported file type. Upload .xlsx or .csv", 400)
+
+    f.stream.seek(0, os.SEEK_END)
+    file_size = f.stream.tell()
+    f.stream.seek(0)
+    if file_size > MAX_UPLOAD_BYTES:
+        return api_response(
+            f"File too large. Max {MAX_UPLOAD_BYTES // (1024 * 1024)} MB; split it into smaller files",
+            413,
+        )
+
     conn = None
     cur = None
+    batches = None
 
     try:
-        # Read file
-        if ext in [".xlsx", ".xls"]:
-            df = pd.read_excel(f, dtype=str)
-        elif ext == ".csv":
-            df = pd.read_csv(f, dtype=str)
-        else:
-            return api_response("Unsupported file type. Upload .xlsx or .csv", 400)
-
-        df.columns = [normalize_header(c) for c in df.columns]
+        # Read file (header row first, then row batches)
+        batches = iter_upload(f, ext)
+        headers = next(batches, [])
 
-        missing = [h for h in EXPECTED_HEADERS if h not in df.columns]
+        missing = [h for h in EXPECTED_HEADERS if h not in headers]
         if missing:
             return api_response(
                 "Invalid file headers",
@@ -202,222 +603,43 @@ def upload_email_send_file():
                 {"missing_headers": missing, "expected": EXPECTED_HEADERS},
             )
 
-        df = df[EXPECTED_HEADERS].copy().fillna("")
-
         conn = get_db_connection()
+        # One transaction for the whole file: every batch is flushed inside it and
+        # committed once at the end, so a failure anywhere rolls the import back
+        conn.start_transaction()
         cur = conn.cursor(dictionary=True)
 
-        skipped = 0
-        inserted = 0
-        updated = 0
-        duplicates_no_change = 0
-        unsubscribed_override_count = 0
-
-        candidates = []
-        dedupe_keys = []
-
-        # Build candidates
-        for _, r in df.iterrows():
-            sender_email = norm_email(r["Sender Email"])
-            receiver_email = norm_email(r["Receiver Email"])
-
-            if not sender_email or not receiver_email:
-                skipped += 1
-                continue
-
-            first_name = norm_text(r["First Name"])
-            company = norm_text(r["Company"])
-            status = norm_text(r["Status"])
-            status_message = norm_text(r["StatusMessage"])
-            sent_at = parse_sent_at(r["SentAt"])
-            subject = norm_text(r["Subject"])
-            body = norm_text(r["Body"])
-            responds_value = (r["Responds"] or "").strip() or None
-            our_response = norm_text(r["Our Response"])
-
-            # ✅ If reply is "unsubscribed" or "not interested", update subscription
-            if is_unsubscribe_response(responds_value):
-                cur.execute(
-                    """
-                    INSERT INTO email_subscription_preferences
-                      (sender_email, receiver_email, is_subscribed, updated_at)
-                    VALUES (%s, %s, 0, %s)
-                    ON DUPLICATE KEY UPDATE
-                      is_subscribed=0,
-                      updated_at=VALUES(updated_at)
-                    """,
-                    (sender_email, receiver_email, datetime.now()),
-                )
-                unsubscribed_override_count += 1
-                status_message = "Receiver Unsubscribed via mail"
-
-            # ✅ DEDUPE includes send_process now
-            dkey = make_dedupe_key(sender_email, receiver_email, sent_at, email_type, send_process)
-            if not dkey:
-                skipped += 1
-                continue
-
-            # Unsubscribe override
-            cur.execute(
-                """
-                SELECT is_subscribed
-                FROM email_subscription_preferences
-                WHERE sender_email=%s
-                AND receiver_email=%s
-                ORDER BY updated_at DESC
-                LIMIT 1
-                """,
-                (sender_email, receiver_email),
-            )
-            pref = cur.fetchone()
-            if pref and str(pref.get("is_subscribed")) == "0":
-                if not is_unsubscribe_response(responds_value):
-                    unsubscribed_override_count += 1
-                responds_value = "Unsubscribed"
-                status_message = "Receiver Unsubscribed via mail"
-
-            candidates.append({
-                "dedupe_key": dkey,
-                "sender_email": sender_email,
-                "receiver_email": receiver_email,
-                "email_type": email_type,
-                "send_process": send_process,   # ✅ NEW
-                "first_name": first_name,
-                "company": company,
-                "status": status,
-                "status_message": status_message,
-                "sent_at": sent_at,
-                "responds": responds_value,
-                "subject": subject,
-                "body": body,
-                "our_response": our_response,
-            })
-            dedupe_keys.append(dkey)
-
-        if not candidates:
+        counts = {
+            "inserted": 0,
+            "updated": 0,
+            "duplicates_no_change": 0,
+            "intra_file_dupes": 0,
+            "skipped": 0,
+            "total_rows_in_file": 0,
+            "unsubscribed_overrides": 0,
+        }
+
+        # Each batch is normalized and flushed on its own; one commit for the whole file
+        valid_rows = 0
+        pref_cache = {}
+        seen_keys = set()
+        for df in batches:
+            valid_rows += import_batch(conn, cur, df, email_type, send_process, counts, pref_cache, seen_keys)
+
+        if not valid_rows:
+            conn.rollback()
             return api_response(
                 "No valid rows found to insert/update (SentAt missing?)",
                 400,
-                {"skipped": skipped},
-            )
-
-        # Fetch existing rows by dedupe_key
-        existing_map = {}
-        CHUNK = 500
-        for i in range(0, len(dedupe_keys), CHUNK):
-            chunk = dedupe_keys[i:i + CHUNK]
-            placeholders = ",".join(["%s"] * len(chunk))
-            cur.execute(
-                f"""
-                SELECT id, dedupe_key, first_name, company, status, status_message,
-                       responds, subject, body, updated_at
-                FROM email_send_logs
-                WHERE dedupe_key IN ({placeholders})
-                """,
-                chunk,
-            )
-            for row in cur.fetchall():
-                existing_map[row["dedupe_key"]] = row
-
-        insert_rows = []
-        update_rows = []
-
-        def same(a, b):
-            return (a or None) == (b or None)
-
-        for c in candidates:
-            ex = existing_map.get(c["dedupe_key"])
-
-            if not ex:
-                insert_rows.append((
-                    c["sender_email"],
-                    c["receiver_email"],
-                    c["email_type"],
-                    c["send_process"],     # ✅ NEW
-                    c["first_name"],
-                    c["company"],
-                    c["status"],
-                    c["status_message"],
-                    c["sent_at"],
-                    c["responds"],
-                    datetime.now(),
-                    c["subject"],
-                    c["body"],
-                    c["our_response"],
-                    c["dedupe_key"],
-                ))
-                continue
-
-            changed = False
-            for field in ["first_name", "company", "status", "status_message", "responds", "subject", "body","our_response"]:
-                if not same(ex.get(field), c.get(field)):
-                    changed = True
-                    break
-
-            set_updated_at = ex.get("updated_at")
-            if not isinstance(set_updated_at, datetime) or changed:
-                set_updated_at = datetime.now()
-
-            if not changed and isinstance(ex.get("updated_at"), datetime):
-                duplicates_no_change += 1
-                continue
-
-            update_rows.append((
-                c["first_name"],
-                c["company"],
-                c["status"],
-                c["status_message"],
-                c["responds"],
-                set_updated_at,
-                c["subject"],
-                c["body"],
-                c["our_response"],
-                int(ex["id"]),
-            ))
-
-        # Execute DB writes
-        if insert_rows:
-            cur.executemany(
-                """
-                INSERT INTO email_send_logs
-                (sender_email, receiver_email, email_type, send_process, first_name, company, status, status_message,
-                 sent_at, responds, updated_at, subject, body, our_response, dedupe_key)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                """,
-                insert_rows,
-            )
-            inserted = cur.rowcount
-
-        if update_rows:
-            cur.executemany(
-                """
-                UPDATE email_send_logs
-                SET first_name=%s,
-                    company=%s,
-                    status=%s,
-                    status_message=%s,
-                    responds=%s,
-                    updated_at=%s,
-                    subject=%s,
-                    body=%s,
-                    our_response=%s
-                WHERE id=%s
-                """,
-                update_rows,
+                {"skipped": counts["skipped"]},
             )
-            updated = cur.rowcount
 
         conn.commit()
 
         return api_response("Imported successfully", 200, {
             "email_type": email_type,
             "send_process": send_process,  # ✅ NEW
-            "inserted": inserted,
-            "updated": updated,
-            "duplicates_no_change": duplicates_no_change,
-            "skipped": skipped,
-            "total_rows_in_file": int(len(df)),
-            "unsubscribed_overrides": unsubscribed_override_count,
+            **counts,
         })
 
     except mysql.connector.IntegrityError as ie:
@@ -437,6 +659,8 @@ def upload_email_send_file():
         return api_response(f"Import failed: {str(e)}", 500)
 
     finally:
+        if batches is not None:
+            batches.close()
         try:
             if cur:
                 cur.close()
@@ -452,6 +676,58 @@ def upload_email_send_file():
 # =========================
 # Report API (Sent / Responds) + Monthly Stats (Current Month Only)
 # =========================
+# MySQL DATE_FORMAT patterns, so report rows come back as ready-made strings.
+# %T is %H:%i:%s spelled so the connector can't mistake a "%s" for a placeholder.
+REPORT_DT_FMT = "%Y-%m-%d %T"
+# keyset cursors keep the fractional part so no rows are skipped within one second
+CURSOR_DT_FMT = "%Y-%m-%d %T.%f"
+# cursor_at for a row whose sort column is NULL (those sort last in DESC order);
+# below any real DATETIME, so it is never confused with one
+NULL_CURSOR_AT = "1000-01-01 00:00:00.000000"
+
+def pop_total_records(cur, rows, where_sql, params, offset):
+    """
+    Strip the COUNT(*) OVER () column from a report page and return the total.
+    A page past the end has no rows to carry it, so only then run a separate COUNT(*).
+    """
+    for r in rows:
+        total = r.pop("total_records")
+    if rows:
+        return int(total or 0)
+    if not offset:
+        return 0
+    cur.execute(f"SELECT COUNT(*) AS total FROM email_send_logs {where_sql}", params)
+    return int((cur.fetchone() or {}).get("total") or 0)
+
+def keyset_where(where, params, sort_col, id_col, cursor_at, cursor_id, use_cursor):
+    """
+    WHERE clause + params for one report page. With a cursor, only rows strictly
+    after it in (sort_col DESC, id DESC) order; the (sort_col) index carries the
+    primary key, so this is an index range scan instead of an OFFSET.
+    NULL sort values come after every date, so they stay reachable: a dated
+    cursor also matches them, a NULL_CURSOR_AT cursor pages through them by id.
+    """
+    if not use_cursor:
+        return (("WHERE " + " AND ".join(where)) if where else ""), params
+    if cursor_at == NULL_CURSOR_AT:
+        page_where = where + [f"{sort_col} IS NULL AND {id_col} < %s"]
+        return "WHERE " + " AND ".join(page_where), params + [cursor_id]
+    page_where = where + [f"(({sort_col}, {id_col}) < (%s, %s) OR {sort_col} IS NULL)"]
+    return "WHERE " + " AND ".join(page_where), params + [cursor_at, cursor_id]
+
+
+def next_page_cursor(rows, per_page, sort_col):
+    """
+    Strip the cursor_at column from a report page and return the cursor for the
+    page after it (None when this was the last page).
+    """
+    at = None
+    for r in rows:
+        at = r.pop("cursor_at")
+    if len(rows) < per_page:
+        return None
+    return {f"cursor_{sort_col}": at or NULL_CURSOR_AT, "cursor_id": rows[-1].get("id")}
+
 @email_send_import_bp.route("/report", methods=["POST"])
 def email_report():
     """
@@ -468,14 +744,22 @@ def email_report():
         "date_from": "YYYY-MM-DD",
         "date_to": "YYYY-MM-DD",
 
-        "responds_filter": "No Response Yet" | "Response" | "Positive Response" | "Unsubscribed"
+        "responds_filter": "No Response Yet" | "Response" | "Positive Response" | "Unsubscribed",
+
+        "cursor_sent_at" | "cursor_updated_at": "...",   (optional, keyset paging)
+        "cursor_id": 123
       }
 
-    - Sent tab filters by DATE(sent_at)
-    - Responds tab filters by DATE(updated_at)
+    - Sent tab filters by the date of sent_at
+    - Responds tab filters by the date of updated_at
+      (both as half-open datetime ranges so the column indexes are used)
     - send_process filters records only (if provided)
     - Monthly stats: current month only, returns BOTH Regular + Follow up 1 + Total
       (monthly stats ignores send_process filter to always show both)
+    - Keyset paging: pass back pagination.next_cursor to get the rows after the
+      previous page without an OFFSET scan (sent tab: cursor_sent_at, responds
+      tab: cursor_updated_at). Cursor pages skip the total, so total_records and
+      total_pages are null there; take them from the first page.
     """
 
     data = request.get_json(silent=True) or {}
@@ -504,6 +788,17 @@ def email_report():
 
     offset = (page - 1) * per_page
 
+    sort_col = "sent_at" if report_type == "sent" else "updated_at"
+    cursor_at = str(data.get(f"cursor_{sort_col}") or "").strip()
+    cursor_id = data.get("cursor_id")
+    use_cursor = bool(cursor_at) and cursor_id not in (None, "")
+    if use_cursor:
+        try:
+            cursor_id = int(cursor_id)
+        except (TypeError, ValueError):
+            return api_response("Invalid cursor_id", 400)
+        offset = 0
+
     conn = None
     cur = None
 
@@ -543,15 +838,13 @@ def email_report():
             rf = responds_filter.strip().lower()
 
             if rf == "no response yet":
-                where.append(
-                    "(responds IS NULL OR TRIM(responds) = '' OR LOWER(TRIM(responds)) = 'no response yet')"
-                )
+                where.append("(responds_norm IS NULL OR responds_norm IN ('', 'no response yet'))")
             elif rf == "unsubscribed":
-                where.append("LOWER(TRIM(responds)) = 'unsubscribed'")
+                where.append("responds_norm = 'unsubscribed'")
             elif rf == "positive response":
-                where.append("LOWER(TRIM(responds)) = 'positive response'")
+                where.append("responds_norm = 'positive response'")
             elif rf == "response":
-                where.append("LOWER(TRIM(responds)) = 'response'")
+                where.append("responds_norm = 'response'")
             else:
                 return api_response(
                     "Invalid responds_filter. Use: No Response Yet | Response | Positive Response | Unsubscribed",
@@ -563,17 +856,17 @@ def email_report():
         # ----------------------------
         if report_type == "sent":
             if date:
-                where.append("DATE(sent_at) = %s")
-                params.append(date)
+                where.append("sent_at >= %s AND sent_at < DATE_ADD(%s, INTERVAL 1 DAY)")
+                params.extend([date, date])
 
             if date_from and date_to:
-                where.append("DATE(sent_at) BETWEEN %s AND %s")
+                where.append("sent_at >= %s AND sent_at < DATE_ADD(%s, INTERVAL 1 DAY)")
                 params.extend([date_from, date_to])
 
             where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-
-            cur.execute(f"SELECT COUNT(*) AS total FROM email_send_logs {where_sql}", params)
-            total_records = int((cur.fetchone() or {}).get("total") or 0)
+            page_where_sql, page_params = keyset_where(where, params, "esl.sent_at", "esl.id", cursor_at, cursor_id, use_cursor)
+            # the window count has to see every matching row, which a cursor page avoids
+            total_col = "" if use_cursor else "COUNT(*) OVER () AS total_records,"
 
             cur.execute(
                 f"""
@@ -586,37 +879,37 @@ def email_report():
                         esl.subject,
                         esl.status,
                         esl.status_message,
-                        esl.sent_at,
+                        DATE_FORMAT(esl.sent_at, '{REPORT_DT_FMT}') AS sent_at,
                         esl.responds,
-                        esl.updated_at,
-
-                        CASE 
-                            WHEN COUNT(eoe.opened_at) > 0 THEN TRUE
-                            ELSE FALSE
-                        END AS is_opened
+                        DATE_FORMAT(esl.updated_at, '{REPORT_DT_FMT}') AS updated_at,
+                        DATE_FORMAT(esl.sent_at, '{CURSOR_DT_FMT}') AS cursor_at,
+                        {total_col}
+
+                        -- opened within 3 days; EXISTS stops at the first open event
+                        -- instead of joining + grouping every event of every row
+                        EXISTS (
+                            SELECT 1
+                            FROM email_open_events eoe
+                            WHERE eoe.sender_email = esl.sender_email
+                            AND eoe.receiver_email = esl.receiver_email
+                            AND eoe.opened_at >= esl.sent_at
+                            AND eoe.opened_at < DATE_ADD(esl.sent_at, INTERVAL 3 DAY)
+                        ) AS is_opened
 
                     FROM email_send_logs esl
 
-                    LEFT JOIN email_open_events eoe
-                        ON esl.sender_email = eoe.sender_email
-                        AND esl.receiver_email = eoe.receiver_email
-                        AND eoe.opened_at >= esl.sent_at
-                        AND eoe.opened_at < DATE_ADD(esl.sent_at, INTERVAL 3 DAY)
-
-                    {where_sql}
+                    {page_where_sql}
 
-                    GROUP BY esl.id
-
-                    ORDER BY esl.sent_at DESC
+                    ORDER BY esl.sent_at DESC, esl.id DESC
                     LIMIT %s OFFSET %s
                 """,
-                params + [per_page, offset],
+                page_params + [per_page, offset],
 )
             rows = cur.fetchall() or []
+            total_records = None if use_cursor else pop_total_records(cur, rows, where_sql, params, offset)
+            next_cursor = next_page_cursor(rows, per_page, "sent_at")
 
             for r in rows:
-                r["sent_at"] = fmt_dt(r.get("sent_at"))
-                r["updated_at"] = fmt_dt(r.get("updated_at"))
                 r["is_opened"] = bool(r.get("is_opened"))
 
         # ----------------------------
@@ -624,21 +917,21 @@ def email_report():
         # ----------------------------
         else:
             if date:
-                where.append("DATE(updated_at) = %s")
-                params.append(date)
+                where.append("updated_at >= %s AND updated_at < DATE_ADD(%s, INTERVAL 1 DAY)")
+                params.extend([date, date])
 
             if date_from and date_to:
-                where.append("DATE(updated_at) BETWEEN %s AND %s")
+                where.append("updated_at >= %s AND updated_at < DATE_ADD(%s, INTERVAL 1 DAY)")
                 params.extend([date_from, date_to])
 
             where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-
-            cur.execute(f"SELECT COUNT(*) AS total FROM email_send_logs {where_sql}", params)
-            total_records = int((cur.fetchone() or {}).get("total") or 0)
+            page_where_sql, page_params = keyset_where(where, params, "updated_at", "id", cursor_at, cursor_id, use_cursor)
+            total_col = "" if use_cursor else ", COUNT(*) OVER () AS total_records"
 
             cur.execute(
                 f"""
                 SELECT
+                    id,
                     sender_email,
                     receiver_email,
                     email_type,
@@ -647,20 +940,20 @@ def email_report():
                     subject,
                     body,
                     our_response,
-                    sent_at,
-                    updated_at
+                    DATE_FORMAT(sent_at, '{REPORT_DT_FMT}') AS sent_at,
+                    DATE_FORMAT(updated_at, '{REPORT_DT_FMT}') AS updated_at,
+                    DATE_FORMAT(updated_at, '{CURSOR_DT_FMT}') AS cursor_at
+                    {total_col}
                 FROM email_send_logs
-                {where_sql}
-                ORDER BY updated_at DESC
+                {page_where_sql}
+                ORDER BY email_send_logs.updated_at DESC, id DESC
                 LIMIT %s OFFSET %s
                 """,
-                params + [per_page, offset],
+                page_params + [per_page, offset],
             )
             rows = cur.fetchall() or []
-
-            for r in rows:
-                r["sent_at"] = fmt_dt(r.get("sent_at"))
-                r["updated_at"] = fmt_dt(r.get("updated_at"))
+            total_records = None if use_cursor else pop_total_records(cur, rows, where_sql, params, offset)
+            next_cursor = next_page_cursor(rows, per_page, "updated_at")
 
         # =========================
         # Monthly Stats (Current Month Only)
@@ -678,92 +971,63 @@ def email_report():
         monthly_base_where.append("sent_at <  DATE_ADD(DATE_FORMAT(NOW(), '%Y-%m-01'), INTERVAL 1 MONTH)")
         monthly_base_where_sql = "WHERE " + " AND ".join(monthly_base_where)
 
-        def fetch_monthly_for_process(process_value: str | None):
-            
-            extra_where = []
-            extra_params = []
-            if process_value:
-                extra_where.append("send_process = %s")
-                extra_params.append(process_value)
-
-            where_sql = monthly_base_where_sql + (" AND " + " AND ".join(extra_where) if extra_where else "")
-
-            cur.execute(
-                f"""
-                SELECT
-                COUNT(*) AS monthly_sent,
-
-                -- ✅ NEW: opened within 3 days
-                SUM(
-                    CASE 
-                    WHEN EXISTS (
-                        SELECT 1
-                        FROM email_open_events eoe
-                        WHERE 
-                        eoe.sender_email = email_send_logs.sender_email
-                        AND eoe.receiver_email = email_send_logs.receiver_email
-                        AND eoe.opened_at >= email_send_logs.sent_at
-                        AND eoe.opened_at < DATE_ADD(email_send_logs.sent_at, INTERVAL 3 DAY)
-                    )
-                    THEN 1 ELSE 0
-                    END
-                ) AS monthly_opened,
-
-                -- ✅ Optional but recommended
-                SUM(
-                    CASE 
-                    WHEN NOT EXISTS (
-                        SELECT 1
-                        FROM email_open_events eoe
-                        WHERE eoe.sender_email = email_send_logs.sender_email
-                        AND eoe.receiver_email = email_send_logs.receiver_email
-                        AND eoe.opened_at >= email_send_logs.sent_at
-                        AND eoe.opened_at < DATE_ADD(email_send_logs.sent_at, INTERVAL 3 DAY)
-                    )
-                    THEN 1 ELSE 0
-                    END
-                ) AS monthly_not_opened,
-
-                SUM(CASE
-                        WHEN LOWER(TRIM(responds)) = 'unsubscribed'
-                        THEN 1 ELSE 0
-                    END) AS monthly_unsubscribed,
-
-                SUM(CASE
-                        WHEN LOWER(TRIM(responds)) = 'response'
-                        THEN 1 ELSE 0
-                    END) AS monthly_responds,
-
-                SUM(CASE
-                        WHEN LOWER(TRIM(responds)) = 'positive response'
-                        THEN 1 ELSE 0
-                    END) AS monthly_positive_responds,
-
-                SUM(CASE
-                        WHEN responds IS NULL
-                        OR TRIM(responds) = ''
-                        OR LOWER(TRIM(responds)) = 'no response yet'
-                        THEN 1 ELSE 0
-                    END) AS monthly_not_responds
+        # One pass over the month, grouped per process; the total is the sum of all groups
+        # (rows with any other send_process only count towards the total).
+        # The CASE compares with the column collation, like a send_process = %s filter would.
+        cur.execute(
+            f"""
+            SELECT
+            CASE
+                WHEN send_process = 'Regular' THEN 'Regular'
+                WHEN send_process = 'Follow up 1' THEN 'Follow up 1'
+            END AS process,
+
+            COUNT(*) AS monthly_sent,
+
+            -- ✅ NEW: opened within 3 days
+            SUM(EXISTS (
+                SELECT 1
+                FROM email_open_events eoe
+                WHERE
+                eoe.sender_email = email_send_logs.sender_email
+                AND eoe.receiver_email = email_send_logs.receiver_email
+                AND eoe.opened_at >= email_send_logs.sent_at
+                AND eoe.opened_at < DATE_ADD(email_send_logs.sent_at, INTERVAL 3 DAY)
+            )) AS monthly_opened,
+
+            -- responds_norm = LOWER(TRIM(responds)), see migrations/004
+            SUM(responds_norm = 'unsubscribed') AS monthly_unsubscribed,
+            SUM(responds_norm = 'response') AS monthly_responds,
+            SUM(responds_norm = 'positive response') AS monthly_positive_responds,
+            SUM(responds_norm IS NULL OR responds_norm IN ('', 'no response yet')) AS monthly_not_responds
+
+            FROM email_send_logs
+            {monthly_base_where_sql}
+            GROUP BY process
+            """,
+            monthly_base_params,
+        )
 
-                FROM email_send_logs
-{where_sql}
-                """,
-                monthly_base_params + extra_params,
-            )
-            d = cur.fetchone() or {}
-            return {
-                "monthly_sent": int(d.get("monthly_sent") or 0),
-                "monthly_opened": int(d.get("monthly_opened") or 0),   # ✅ NEW
-                "monthly_not_opened": int(d.get("monthly_not_opened") or 0),  # optional
-                "monthly_unsubscribed": int(d.get("monthly_unsubscribed") or 0),
-                "monthly_responds": int(d.get("monthly_responds") or 0),
-                "monthly_positive_responds": int(d.get("monthly_positive_responds") or 0),
-                "monthly_not_responds": int(d.get("monthly_not_responds") or 0),
-            }
-        monthly_regular = fetch_monthly_for_process("Regular")
-        monthly_followup1 = fetch_monthly_for_process("Follow up 1")
-        monthly_total = fetch_monthly_for_process(None)
+        monthly_keys = (
+            "monthly_sent",
+            "monthly_opened",
+            "monthly_not_opened",  # optional
+            "monthly_unsubscribed",
+            "monthly_responds",
+            "monthly_positive_responds",
+            "monthly_not_responds",
+        )
+        monthly_by_process = {}
+        monthly_total = dict.fromkeys(monthly_keys, 0)
+        for d in cur.fetchall() or []:
+            d["monthly_not_opened"] = int(d.get("monthly_sent") or 0) - int(d.get("monthly_opened") or 0)
+            stats = {k: int(d.get(k) or 0) for k in monthly_keys}
+            monthly_by_process[d.get("process")] = stats
+            for k in monthly_keys:
+                monthly_total[k] += stats[k]
+
+        monthly_regular = monthly_by_process.get("Regular") or dict.fromkeys(monthly_keys, 0)
+        monthly_followup1 = monthly_by_process.get("Follow up 1") or dict.fromkeys(monthly_keys, 0)
 
         return api_response(
             f"{report_type.capitalize()} report fetched successfully",
@@ -775,7 +1039,8 @@ def email_report():
                     "page": page,
                     "per_page": per_page,
                     "total_records": total_records,
-                    "total_pages": (total_records + per_page - 1) // per_page,
+                    "total_pages": None if total_records is None else (total_records + per_page - 1) // per_page,
+                    "next_cursor": next_cursor,
                 },
                 "filters_applied": {
                     "email_type": email_type or None,
@@ -809,22 +1074,28 @@ def email_report():
             pass
 
 
+# Constant payload, serialized once; clients and proxies may cache it for a day
+RESPONDS_OPTIONS = [
+    {"label": "No Response Yet"},
+    {"label": "Response"},
+    {"label": "Positive Response"},
+    {"label": "Unsubscribed"},
+]
+# Same bytes jsonify would produce (compact, sorted keys, trailing newline)
+RESPONDS_OPTIONS_JSON = json.dumps(
+    api_response("Responds options fetched successfully", 200, {"options": RESPONDS_OPTIONS})[0],
+    separators=(",", ":"),
+    sort_keys=True,
+) + "\n"
+
+
 @email_send_import_bp.route("/responds-options", methods=["GET"])
 def get_responds_options():
     """
     Returns dropdown options for responds filter
     """
-
-    options = [
-        {"label": "No Response Yet"},
-        {"label": "Response"},
-        {"label": "Positive Response"},
-        {"label": "Unsubscribed"},
-    ]
-    print("Dropdown options for responds filter fetched successfully")
-
-    return api_response(
-        "Responds options fetched successfully",
-        200,
-        {"options": options},
+    return Response(
+        RESPONDS_OPTIONS_JSON,
+        mimetype="application/json",
+        headers={"Cache-Control": "public, max-age=86400"},
     )
@@ -1,40 +1,161 @@
-from flask import Blueprint, request, Response
+from flask import Blueprint, request
+from markupsafe import escape
 from datetime import datetime
+import atexit
 import base64
-import mysql.connector
+import functools
+import hashlib
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import socket
+import threading
+import time
+from urllib.parse import parse_qsl
+from mysql.connector import pooling
 from config import Config
 
 email_tracking_bp = Blueprint("email_tracking", __name__)
 
+# Request threads only put log records on a queue; the "log-writer" background
+# thread does the actual (locking) stderr write
+logger = logging.getLogger("email_tracking")
+logger.setLevel(os.getenv("TRACK_LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_output = logging.StreamHandler()
+_log_output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
 # 1x1 transparent GIF
 GIF_BASE64 = "R0lGODlhAQABAIAAAAAAAP///ywAAAAAAQABAAACAUwAOw=="
 PIXEL_BYTES = base64.b64decode(GIF_BASE64)
 
 
+# Opens are spread over this many queues, each drained by its own flusher thread on
+# its own pooled connection, so batches are written in parallel (power of two: the shard
+# is picked with a mask)
+OPEN_FLUSH_SHARDS = 4
+
+# get_connection() fails at once when the pool is empty, so every thread that can hold
+# a connection needs its own: one per request thread (same GUNICORN_THREADS that
+# gunicorn.conf.py reads) + the open-event flushers + the unsub-log writer.
+# mysql-connector caps a pool at CNX_POOL_MAXSIZE (32).
+TRACK_REQUEST_THREADS = int(os.getenv("GUNICORN_THREADS", "8"))
+TRACK_DB_POOL_SIZE = min(TRACK_REQUEST_THREADS + OPEN_FLUSH_SHARDS + 1, pooling.CNX_POOL_MAXSIZE)
+
+_track_pool = None
+_track_pool_lock = threading.Lock()
+
+
+def _resolve_db_host(host):
+    # Resolved once per pool, so reconnects and pool growth skip getaddrinfo;
+    # falls back to the name (resolved per connect) if DNS is unavailable
+    if not host:
+        return host
+    try:
+        # first address getaddrinfo prefers, IPv4 or IPv6 (AAAA-only hosts included)
+        return socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0][4][0]
+    except OSError:
+        return host
+
+
+def get_tracking_pool():
+    # Created on first use so the app still boots while the DB is unreachable
+    global _track_pool
+    if _track_pool is None:
+        with _track_pool_lock:
+            if _track_pool is None:
+                _track_pool = pooling.MySQLConnectionPool(
+                    pool_name="email_tracking",
+                    pool_size=TRACK_DB_POOL_SIZE,
+                    # No COM_RESET_CONNECTION round trip on every release: the handlers
+                    # keep no session state
+                    pool_reset_session=False,
+                    # Every write here is a single statement (one multi-row INSERT per
+                    # open batch, one upsert / UPDATE per pair), so it commits on its own
+                    # and no COMMIT round trip or open transaction can outlive a request
+                    autocommit=True,
+                    # same session clock as the import pool, so NOW() matches the stored IST times
+                    init_command="SET time_zone = '+05:30'",
+                    host=_resolve_db_host(Config.TRACK_DB_HOST),
+                    user=Config.TRACK_DB_USER,
+                    password=Config.TRACK_DB_PASS,
+                    database=Config.TRACK_DB_NAME,
+                    port=Config.TRACK_DB_PORT,
+                )
+    return _track_pool
+
+
 def get_tracking_db():
-    return mysql.connector.connect(
-        host=Config.TRACK_DB_HOST,
-        user=Config.TRACK_DB_USER,
-        password=Config.TRACK_DB_PASS,
-        database=Config.TRACK_DB_NAME,
-        port=Config.TRACK_DB_PORT,
-    )
+    # conn.close() hands the connection back to the pool
+    return get_tracking_pool().get_connection()
 
 
 def api_response(message, status=200, data=None):
     return {"message": message, "status": status, "data": data or {}}, status
 
 
+# Pixel hits and repeat unsubscribes keep presenting the same addresses;
+# bounded, so it needs no explicit eviction
+@functools.lru_cache(maxsize=65536)
 def norm_email(val: str) -> str:
     return (val or "").strip().lower()
 
 
+PIXEL_ETAG = '"%s"' % hashlib.md5(PIXEL_BYTES).hexdigest()
+
+PIXEL_HEADERS = (
+    ("Content-Type", "image/gif"),
+    ("Content-Length", str(len(PIXEL_BYTES))),
+    ("Cache-Control", "no-store, no-cache, must-revalidate, max-age=0"),
+    ("Pragma", "no-cache"),
+    ("Expires", "0"),
+    ("ETag", PIXEL_ETAG),
+)
+
+PIXEL_NOT_MODIFIED_HEADERS = (
+    ("Cache-Control", "no-store, no-cache, must-revalidate, max-age=0"),
+    ("ETag", PIXEL_ETAG),
+)
+
+# /event beacons answer 204 with no body
+EVENT_HEADERS = (("Cache-Control", "no-store"),)
+
+
+def _str_param(src, *keys) -> str:
+    # first non-empty value among `keys`; JSON numbers / lists / objects count as missing
+    for k in keys:
+        v = src.get(k)
+        if v and isinstance(v, str):
+            return v
+    return ""
+
+
+def _extract(src):
+    # (send_key, sender, receiver) from a dict / MultiDict, stripped and normalised
+    # once here for the pixel, the beacon and unsubscribe
+    return (
+        _str_param(src, "k").strip(),
+        norm_email(_str_param(src, "from", "sender")),
+        norm_email(_str_param(src, "to", "email")),
+    )
+
+
+def _request_params():
+    # JSON object body, else form fields / query string (request.values); any other
+    # JSON (array, string, number) is ignored rather than treated as params
+    payload = request.get_json(silent=True)
+    if payload and isinstance(payload, dict):
+        return payload
+    return request.values
+
+
 def _pixel_response():
-    resp = Response(PIXEL_BYTES, mimetype="image/gif")
-    resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    resp.headers["Pragma"] = "no-cache"
-    resp.headers["Expires"] = "0"
-    return resp
+    # body/status/headers are all prebuilt; Flask turns the tuple into the response
+    return PIXEL_BYTES, 200, PIXEL_HEADERS
 
 
 def _now_epoch():
@@ -42,23 +163,22 @@ def _now_epoch():
 
 
 def _parse_epoch(val):
+    if not val:
+        return 0
+    s = val.strip() if isinstance(val, str) else str(val).strip()
+    # plain integer epoch (every pixel link): skip the float round trip
+    if s.isascii() and s.isdigit():
+        return int(s)
     try:
-        if not val:
-            return 0
-        return int(float(str(val).strip()))
+        return int(float(s))
     except Exception:
         return 0
 
 
 def _esc_html(s: str) -> str:
-    # minimal HTML escaping (prevents HTML injection in confirm page)
-    return (
-        (s or "")
-        .replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-    )
+    # HTML escaping for the confirm page (prevents HTML injection); markupsafe's
+    # C speedups escape & < > " ' in one pass. Markup is a str subclass.
+    return escape(s or "")
 
 
 def _client_ip() -> str:
@@ -69,8 +189,8 @@ def _client_ip() -> str:
     return request.remote_addr or ""
 
 
-def _confirm_page_html(send_key: str, sender: str, receiver: str) -> str:
-    return f"""<!doctype html>
+# Static parts of the confirm page, split around the dynamic values
+_CONFIRM_PAGE_HEAD = """<!doctype html>
 <html>
 <head>
   <meta charset="utf-8">
@@ -85,14 +205,19 @@ def _confirm_page_html(send_key: str, sender: str, receiver: str) -> str:
     </p>
 
     <div style="margin:0 0 14px;font-size:12px;color:#666;line-height:1.4;">
-      <div><b>Sender:</b> {_esc_html(sender) if sender else "-"}</div>
-      <div><b>Receiver:</b> {_esc_html(receiver) if receiver else "-"}</div>
-    </div>
-
-    <form method="POST" action="/email/email_tracking/unsub" style="margin:0;">
-      <input type="hidden" name="k" value="{_esc_html(send_key)}">
-      <input type="hidden" name="from" value="{_esc_html(sender)}">
-      <input type="hidden" name="to" value="{_esc_html(receiver)}">
+      <div><b>Sender:</b> """
+_CONFIRM_PAGE_AFTER_SENDER = """</div>
+      <div><b>Receiver:</b> """
+_CONFIRM_PAGE_AFTER_RECEIVER = (
+    "</div>\n"
+    "    </div>\n"
+    "\n"
+    '    <form method="POST" action="/email/email_tracking/unsub" style="margin:0;">\n'
+    '      <input type="hidden" name="k" value="'
+)
+_CONFIRM_PAGE_AFTER_KEY = '">\n      <input type="hidden" name="from" value="'
+_CONFIRM_PAGE_AFTER_FROM = '">\n      <input type="hidden" name="to" value="'
+_CONFIRM_PAGE_TAIL = """">
 
       <button type="submit"
         style="background:#d92d20;color:#fff;border:none;padding:10px 14px;border-radius:10px;cursor:pointer;font-weight:600;">
@@ -113,52 +238,337 @@ def _confirm_page_html(send_key: str, sender: str, receiver: str) -> str:
 </html>"""
 
 
+def _confirm_page_html(send_key: str, sender: str, receiver: str) -> str:
+    sender_html = _esc_html(sender)
+    receiver_html = _esc_html(receiver)
+    return "".join((
+        _CONFIRM_PAGE_HEAD,
+        sender_html or "-",
+        _CONFIRM_PAGE_AFTER_SENDER,
+        receiver_html or "-",
+        _CONFIRM_PAGE_AFTER_RECEIVER,
+        _esc_html(send_key),
+        _CONFIRM_PAGE_AFTER_KEY,
+        sender_html,
+        _CONFIRM_PAGE_AFTER_FROM,
+        receiver_html,
+        _CONFIRM_PAGE_TAIL,
+    ))
+
+
 # =========================================================
 # OPEN TRACKING
 # =========================================================
-@email_tracking_bp.route("/open.gif", methods=["GET"])
-def track_open():
-    send_key = (request.args.get("k") or "").strip()
-    st_epoch = _parse_epoch(request.args.get("st"))
+# Opens are queued and written by a background thread in batches, so the
+# pixel goes back without waiting on the DB.
+OPEN_FLUSH_BATCH = 500
+OPEN_FLUSH_INTERVAL = 0.1  # seconds to keep collecting after the first queued open
+OPEN_QUEUE_MAX = 100000  # beyond this (DB down for a long time) new opens are dropped
 
-    receiver = norm_email(request.args.get("to", ""))
-    sender = norm_email(request.args.get("from", ""))
+_open_queues = [queue.Queue(maxsize=OPEN_QUEUE_MAX // OPEN_FLUSH_SHARDS) for _ in range(OPEN_FLUSH_SHARDS)]
 
-    if not send_key:
-        return _pixel_response()
 
-    if st_epoch <= 0:
-        return _pixel_response()
+OPEN_INSERT_SQL = """
+    INSERT INTO email_open_events
+      (sender_email, receiver_email, send_key, opened_at)
+    VALUES """
+OPEN_INSERT_ROW = "(%s, %s, %s, %s)"
 
-    if _now_epoch() < (st_epoch + 600):
-        return _pixel_response()
 
+def _write_open_events(batch):
+    conn = None
+    cur = None
     try:
         conn = get_tracking_db()
         cur = conn.cursor()
-
+        # One explicit multi-row INSERT per batch. OPEN_FLUSH_BATCH keeps it far below
+        # max_allowed_packet: values come from a URL, which gunicorn caps at ~4 KB.
         cur.execute(
-            """
-            INSERT INTO email_open_events
-              (sender_email, receiver_email, send_key, opened_at)
-            VALUES (%s, %s, %s, %s)
-            """,
-            (sender, receiver, send_key, datetime.now()),
+            OPEN_INSERT_SQL + ",".join([OPEN_INSERT_ROW] * len(batch)),
+            [v for row in batch for v in row],
         )
 
-        conn.commit()
-        cur.close()
-        conn.close()
-
     except Exception as e:
-        print("Open tracking error:", e)
+        _log(logging.ERROR, "open.write_failed dropped=%d error=%s", len(batch), e)
+
+    finally:
+        try:
+            if cur:
+                cur.close()
+        except Exception:
+            pass
+        try:
+            if conn:
+                conn.close()
+        except Exception:
+            pass
+
+
+def _open_flush_loop(q):
+    while True:
+        batch = [q.get()]
+        deadline = time.monotonic() + OPEN_FLUSH_INTERVAL
+        while len(batch) < OPEN_FLUSH_BATCH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=timeout))
+            except queue.Empty:
+                break
+        _write_open_events(batch)
+
+
+def _flush_open_events(q):
+    # on worker shutdown: write whatever the flusher thread hasn't picked up yet
+    while True:
+        batch = []
+        try:
+            while len(batch) < OPEN_FLUSH_BATCH:
+                batch.append(q.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return
+        _write_open_events(batch)
+
+
+# Mail security scanners prefetch every image right after delivery; their hits
+# are not opens. (Gmail/Yahoo image proxies are NOT listed: real opens arrive
+# through them.)
+BOT_UA_RE = re.compile(r"proofpoint|barracuda|mimecast|symantec|bitdefender", re.IGNORECASE)
+
+# Repeat loads of the same pixel (client re-renders, preview + full view) are
+# recorded once. Two sets are kept and rotated every OPEN_DEDUPE_SECONDS, so a
+# key is remembered for one to two windows; a set membership test is all a hit
+# costs, with no per-key expiry bookkeeping.
+OPEN_DEDUPE_SECONDS = 30
+OPEN_DEDUPE_MAX = 200000  # per set; a flood beyond this just starts a new window early
+
+_recent_opens = set()
+_previous_opens = set()
+_recent_opens_rotate_at = 0.0
+_recent_opens_lock = threading.Lock()
+
+
+def _seen_recently(send_key: str) -> bool:
+    global _recent_opens, _previous_opens, _recent_opens_rotate_at
+    now = time.monotonic()
+    with _recent_opens_lock:
+        if now >= _recent_opens_rotate_at or len(_recent_opens) >= OPEN_DEDUPE_MAX:
+            _previous_opens = _recent_opens
+            _recent_opens = set()
+            _recent_opens_rotate_at = now + OPEN_DEDUPE_SECONDS
+        if send_key in _recent_opens or send_key in _previous_opens:
+            return True
+        _recent_opens.add(send_key)
+        return False
+
+
+_background_threads = {}
+_background_lock = threading.Lock()
+
+
+def _log_loop():
+    while True:
+        _log_output.handle(_log_queue.get())
+
+
+def _flush_logs():
+    try:
+        while True:
+            _log_output.handle(_log_queue.get_nowait())
+    except queue.Empty:
+        pass
+
+
+# registered up front so it runs after every other exit flush (atexit is LIFO)
+atexit.register(_flush_logs)
+
+
+def _log(level, msg, *args):
+    _ensure_background("log-writer", _log_loop)
+    logger.log(level, msg, *args)
+
 
+def _ensure_background(name, loop, flush=None):
+    # Started on first use, i.e. inside the (forked) worker process that serves the
+    # requests; `flush` drains what is still queued when the worker exits
+    if name not in _background_threads:
+        with _background_lock:
+            if name not in _background_threads:
+                if flush:
+                    atexit.register(flush)
+                thread = threading.Thread(target=loop, name=name, daemon=True)
+                thread.start()
+                _background_threads[name] = thread
+
+
+def _queue_open(src, user_agent: str):
+    """
+    Validate one pixel hit and queue it as an open. Shared by the Flask routes and
+    the raw WSGI fast path; src is the request params (dict / MultiDict).
+    """
+    if BOT_UA_RE.search(user_agent):
+        return
+
+    send_key, sender, receiver = _extract(src)
+    st_epoch = _parse_epoch(src.get("st"))
+
+    if not send_key:
+        return
+
+    if st_epoch <= 0:
+        return
+
+    if _now_epoch() < (st_epoch + 600):
+        return
+
+    if _seen_recently(send_key):
+        return
+
+    shard = hash(send_key) & (OPEN_FLUSH_SHARDS - 1)
+    q = _open_queues[shard]
+    _ensure_background(
+        f"open-events-flusher-{shard}",
+        functools.partial(_open_flush_loop, q),
+        functools.partial(_flush_open_events, q),
+    )
+    try:
+        q.put_nowait((sender, receiver, send_key, datetime.now()))
+    except queue.Full:
+        _log(logging.WARNING, "open.queue_full k=%s dropped", send_key)
+
+
+@email_tracking_bp.route("/open.gif", methods=["GET", "HEAD"])
+def track_open():
+    # Probes, not opens: HEAD (Flask would otherwise run the full GET path for it)
+    # and revalidation of a pixel the client already holds
+    if request.method == "HEAD":
+        return _pixel_response()
+    if PIXEL_ETAG in request.headers.get("If-None-Match", ""):
+        return b"", 304, PIXEL_NOT_MODIFIED_HEADERS
+
+    _queue_open(request.args, request.headers.get("User-Agent", ""))
     return _pixel_response()
 
 
+@email_tracking_bp.route("/event", methods=["GET", "POST"])
+def track_event():
+    """
+    Open beacon for mails whose visible pixel is a static file (served by
+    nginx/CDN): same k / st / to / from params as open.gif, from the query
+    string, a form body (navigator.sendBeacon) or JSON. Only queues the open;
+    there is no body to send back.
+    """
+    src = _request_params()
+    _queue_open(src, request.headers.get("User-Agent", ""))
+    return b"", 204, EVENT_HEADERS
+
+
+def pixel_middleware(wsgi_app, path: str):
+    """
+    Wrap the Flask WSGI app so plain GETs of the pixel at `path` are answered
+    without Flask's request/response machinery. HEAD, conditional requests and
+    everything else fall through to `wsgi_app` (and to track_open).
+    """
+    def app(environ, start_response):
+        if (
+            environ.get("PATH_INFO") != path
+            or environ.get("REQUEST_METHOD") != "GET"
+            or "HTTP_IF_NONE_MATCH" in environ
+        ):
+            return wsgi_app(environ, start_response)
+
+        args = {}
+        for k, v in parse_qsl(environ.get("QUERY_STRING", ""), keep_blank_values=True):
+            args.setdefault(k, v)  # first value wins, like request.args.get
+        _queue_open(args, environ.get("HTTP_USER_AGENT", ""))
+
+        # fresh list per response: outer WSGI layers may append to it
+        start_response("200 OK", list(PIXEL_HEADERS))
+        return [PIXEL_BYTES]
+
+    return app
+
+
 # =========================================================
 # UNSUBSCRIBE (POST ONLY)
 # =========================================================
+# The preference row is what stops future sends, so it is written before the
+# response goes back. Marking the latest log row is report bookkeeping only and
+# is done by a background thread; if its queue is full the request does it inline.
+UNSUB_LOG_BATCH = 100
+UNSUB_LOG_QUEUE_MAX = 10000
+
+UNSUB_LOG_SQL = """
+    UPDATE email_send_logs
+    SET responds='UNSUBSCRIBED',
+        status_message='Receiver unsubscribed via link',
+        updated_at=NOW()
+    WHERE id = (
+        SELECT id FROM (
+            SELECT id
+            FROM email_send_logs
+            WHERE sender_email=%s
+              AND receiver_email=%s
+              AND status='SENT'
+              AND (responds IS NULL OR responds='' OR responds='No Response Yet')
+            ORDER BY sent_at DESC, id DESC
+            LIMIT 1
+        ) x
+    )
+"""
+
+_unsub_log_queue = queue.Queue(maxsize=UNSUB_LOG_QUEUE_MAX)
+
+
+def _mark_unsub_logs(pairs):
+    conn = None
+    cur = None
+    try:
+        conn = get_tracking_db()
+        cur = conn.cursor()
+        cur.executemany(UNSUB_LOG_SQL, pairs)
+
+    except Exception as e:
+        _log(logging.ERROR, "unsub.log_update_failed pairs=%d error=%s", len(pairs), e)
+
+    finally:
+        try:
+            if cur:
+                cur.close()
+        except Exception:
+            pass
+        try:
+            if conn:
+                conn.close()
+        except Exception:
+            pass
+
+
+def _drain_unsub_logs(pairs):
+    try:
+        while len(pairs) < UNSUB_LOG_BATCH:
+            pairs.append(_unsub_log_queue.get_nowait())
+    except queue.Empty:
+        pass
+    return pairs
+
+
+def _unsub_log_loop():
+    while True:
+        _mark_unsub_logs(_drain_unsub_logs([_unsub_log_queue.get()]))
+
+
+def _flush_unsub_logs():
+    while True:
+        pairs = _drain_unsub_logs([])
+        if not pairs:
+            return
+        _mark_unsub_logs(pairs)
+
+
 @email_tracking_bp.route("/unsub", methods=["POST"])
 def unsubscribe():
     """
@@ -174,23 +584,9 @@ def unsubscribe():
     Set responds='UNSUBSCRIBED' for the latest SENT+NOT_RESPONDED row for sender/receiver
     """
 
-    payload = request.get_json(silent=True) or {}
-
-    sender = norm_email(
-        payload.get("from")
-        or payload.get("sender")
-        or request.form.get("from")
-        or request.form.get("sender")
-    )
-
-    receiver = norm_email(
-        payload.get("to")
-        or payload.get("email")
-        or request.form.get("to")
-        or request.form.get("email")
-    )
+    src = _request_params()
 
-    send_key = (payload.get("k") or request.form.get("k") or "").strip()  # optional
+    send_key, sender, receiver = _extract(src)  # send_key is optional
 
     if not sender or not receiver:
         return api_response("Missing sender/receiver", 400)
@@ -200,51 +596,31 @@ def unsubscribe():
     try:
         conn = get_tracking_db()
         cur = conn.cursor()
-        now_dt = datetime.now()
 
         # 1) Upsert subscription preference
         cur.execute(
             """
             INSERT INTO email_subscription_preferences
               (sender_email, receiver_email, is_subscribed, updated_at)
-            VALUES (%s, %s, 0, %s)
+            VALUES (%s, %s, 0, NOW())
             ON DUPLICATE KEY UPDATE
               is_subscribed=0,
               updated_at=VALUES(updated_at)
             """,
-            (sender, receiver, now_dt),
+            (sender, receiver),
         )
 
-        # 2) Update latest SENT + NOT_RESPONDED log row (no insert)
-        cur.execute(
-            """
-            UPDATE email_send_logs
-            SET responds=%s,
-                status_message=%s,
-                updated_at=%s
-            WHERE id = (
-                SELECT id FROM (
-                    SELECT id
-                    FROM email_send_logs
-                    WHERE sender_email=%s
-                      AND receiver_email=%s
-                      AND status='SENT'
-                      AND (responds IS NULL OR responds='' OR responds='No Response Yet')
-                    ORDER BY sent_at DESC, id DESC
-                    LIMIT 1
-                ) x
-            )
-            """,
-            (
-                "UNSUBSCRIBED",
-                "Receiver unsubscribed via link",
-                now_dt,
-                sender,
-                receiver,
-            ),
-        )
+        # Back to the pool before step 2, whose queue-full fallback takes a connection
+        cur.close()
+        conn.close()
+        cur = conn = None
 
-        conn.commit()
+        # 2) Update latest SENT + NOT_RESPONDED log row (no insert), in the background
+        _ensure_background("unsub-log-writer", _unsub_log_loop, _flush_unsub_logs)
+        try:
+            _unsub_log_queue.put_nowait((sender, receiver))
+        except queue.Full:
+            _mark_unsub_logs([(sender, receiver)])
 
         return api_response(
             "Unsubscribed successfully",
@@ -258,11 +634,6 @@ def unsubscribe():
         )
 
     except Exception as e:
-        try:
-            if conn:
-                conn.rollback()
-        except Exception:
-            pass
         return api_response(f"Unsubscribe failed: {str(e)}", 500)
 
     finally: